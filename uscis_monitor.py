@@ -4,16 +4,35 @@ USCIS Application Monitor
 Monitors USCIS case status changes and sends notifications via Home Assistant
 """
 
+import os
+import csv
 import json
 import time
+import random
+import asyncio
 import hashlib
-import requests
+import httpx
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import yaml
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Fields that update frequently but don't indicate status changes; skipped when hashing
+IGNORED_FIELDS = ('updatedAtTimestamp', 'createdAtTimestamp')
+
+# Attempts per case fetch before giving up for this cycle
+FETCH_ATTEMPTS = 3
+
+# Returned by get_case_data when USCIS answers 304 Not Modified or
+# returns a body identical to the previous one
+NOT_MODIFIED = object()
+
 class USCISMonitor:
     def __init__(self, config_path: str = "config.yaml"):
         self.config_path = config_path
@@ -21,6 +40,12 @@ class USCISMonitor:
         self.setup_logging()
         self.state_file = Path(self.config.get('state_file', 'uscis_state.json'))
         self.previous_states = self.load_previous_states()
+        self.cookie_file = self.config.get('browser_cookies_file', 'uscis_cookies.txt')
+        self._cookies_mtime = self.get_cookie_file_mtime()
+        self.cookies = self.load_cookies_from_file()
+        self._case_url_fmt = self.config['uscis_api_base'] + '{}'
+        self.ha_session, self._ha_url = self.create_ha_session()
+        self._hashers = {}
         
     def load_config(self) -> dict:
         """Load configuration from YAML file"""
@@ -61,7 +86,8 @@ class USCISMonitor:
     
     def setup_logging(self):
         """Setup logging configuration"""
-        log_level = getattr(logging, self.config.get('log_level', 'INFO'))
+        # basicConfig accepts level names directly
+        log_level = self.config.get('log_level', 'INFO').upper()
         log_file = self.config.get('log_file', 'uscis_monitor.log')
         
         logging.basicConfig(
@@ -74,240 +100,534 @@ class USCISMonitor:
         )
         self.logger = logging.getLogger(__name__)
     
+    def create_client(self) -> httpx.AsyncClient:
+        """Create the HTTP/2 client shared by all case fetches in one cycle
+        
+        All cases live on the same host, so a single multiplexed connection
+        serves every request with one TLS handshake.
+        """
+        return httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=1),
+            cookies=self.cookies,
+            follow_redirects=True,
+            headers={
+                'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+                'Referer': 'https://my.uscis.gov/',
+                'Accept': 'application/json, text/plain, */*'
+            }
+        )
+    
+    def create_ha_session(self) -> Tuple[Optional[httpx.Client], Optional[str]]:
+        """Create the Home Assistant session and notify URL, if configured"""
+        ha_config = self.config.get('home_assistant', {})
+        
+        if not ha_config:
+            return None, None
+        
+        url = f"{ha_config['url']}/api/services/notify/{ha_config['notify_service'].split('.')[1]}"
+        
+        session = httpx.Client(headers={
+            'Authorization': f"Bearer {ha_config['token']}",
+            'Content-Type': 'application/json'
+        })
+        return session, url
+    
     def load_cookies_from_file(self) -> dict:
         """Load cookies from Netscape format cookie file"""
         cookies = {}
-        cookie_file = self.config.get('browser_cookies_file', 'uscis_cookies.txt')
+        cookie_file = self.cookie_file
         
         try:
-            with open(cookie_file, 'r') as f:
-                for line in f:
-                    if line.startswith('#') or not line.strip():
-                        continue
-                    
-                    parts = line.strip().split('\t')
-                    if len(parts) >= 7:
-                        domain, _, path, secure, expires, name, value = parts[:7]
-                        cookies[name] = value
+            with open(cookie_file, 'r', newline='') as f:
+                # Fields: domain, flag, path, secure, expires, name, value
+                reader = csv.reader(f, delimiter='\t', quoting=csv.QUOTE_NONE)
+                cookies = {row[5]: row[6] for row in reader
+                           if len(row) >= 7 and not row[0].startswith('#')}
                         
         except FileNotFoundError:
-            self.logger.error(f"Cookie file {cookie_file} not found.")
+            self.logger.error("Cookie file %s not found.", cookie_file)
             self.logger.info("Please export cookies from your browser:")
             self.logger.info("1. Login to my.uscis.gov in your browser")
             self.logger.info("2. Install a cookie export extension")
             self.logger.info("3. Export cookies in Netscape format")
-            self.logger.info(f"4. Save as {cookie_file}")
+            self.logger.info("4. Save as %s", cookie_file)
             
         return cookies
     
+    def get_cookie_file_mtime(self) -> Optional[float]:
+        """Return the cookie file modification time, or None if it is missing"""
+        try:
+            return os.stat(self.cookie_file).st_mtime
+        except FileNotFoundError:
+            return None
+    
+    def refresh_cookies(self):
+        """Reload cookies only if the cookie file changed since the last load"""
+        mtime = self.get_cookie_file_mtime()
+        if mtime != self._cookies_mtime:
+            self.logger.info("Cookie file changed, reloading cookies")
+            self._cookies_mtime = mtime
+            self.cookies = self.load_cookies_from_file()
+    
     def load_previous_states(self) -> dict:
         """Load previous case states from file"""
         if self.state_file.exists():
             try:
-                with open(self.state_file, 'r') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
-                pass
+                if orjson is not None:
+                    stored = orjson.loads(self.state_file.read_bytes())
+                else:
+                    with open(self.state_file, 'r') as f:
+                        stored = json.load(f)
+            except (ValueError, FileNotFoundError):
+                return {}
+            
+            # Older state files are keyed by receipt number rather than columnar
+            states = self.states_from_columns(stored) if 'receipt_numbers' in stored else stored
+            
+            # Older states also stored the full case data; keep only its summary
+            for state in states.values():
+                if 'data' in state:
+                    state.update(self.summarize_case(state.pop('data')))
+                    state.pop('field_digests', None)
+                    state.pop('event_digests', None)
+            return states
         return {}
     
     def save_states(self, states: dict):
-        """Save current states to file"""
-        with open(self.state_file, 'w') as f:
-            json.dump(states, f, indent=2, default=str)
+        """Save current states to file atomically"""
+        columns = self.states_to_columns(states)
+        if orjson is not None:
+            data = orjson.dumps(columns, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        else:
+            data = json.dumps(columns, indent=2, default=str).encode('utf-8')
+        
+        # Write to a temp file and swap it in so a crash never leaves a truncated state file
+        tmp = self.state_file.with_suffix('.json.tmp')
+        tmp.write_bytes(data)
+        os.replace(tmp, self.state_file)
     
-    def get_case_data(self, receipt_number: str) -> Optional[dict]:
-        """Fetch case data from USCIS API"""
-        url = f"{self.config['uscis_api_base']}{receipt_number}"
-        cookies = self.load_cookies_from_file()
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Referer': 'https://my.uscis.gov/',
-            'Accept': 'application/json, text/plain, */*'
-        }
+    def states_to_columns(self, states: dict) -> dict:
+        """Convert per-case states to the columnar state file layout
         
-        try:
-            response = requests.get(url, cookies=cookies, headers=headers, timeout=30)
-            response.raise_for_status()
-            return response.json()
-            
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Error fetching data for {receipt_number}: {e}")
-            return None
+        Each state field becomes one list parallel to 'receipt_numbers', so
+        field names are stored once instead of once per case.
+        """
+        receipt_numbers = list(states)
+        fields = sorted({field for state in states.values() for field in state})
+        
+        columns = {'receipt_numbers': receipt_numbers}
+        for field in fields:
+            columns[field] = [states[receipt_number].get(field) for receipt_number in receipt_numbers]
+        return columns
+    
+    def states_from_columns(self, columns: dict) -> dict:
+        """Convert the columnar state file layout back to per-case states"""
+        receipt_numbers = columns['receipt_numbers']
+        states = {receipt_number: {} for receipt_number in receipt_numbers}
+        
+        for field, values in columns.items():
+            if field == 'receipt_numbers':
+                continue
+            for receipt_number, value in zip(receipt_numbers, values):
+                # None marks a field the case didn't have
+                if value is not None:
+                    states[receipt_number][field] = value
+        return states
+    
+    async def get_case_data(self, client: httpx.AsyncClient, receipt_number: str) -> Tuple[Optional[dict], dict]:
+        """Fetch case data from USCIS API
+        
+        Returns the parsed case data (or NOT_MODIFIED / None) together with the
+        response validators and body hash to store for the next cycle.
+        """
+        url = self._case_url_fmt.format(receipt_number)
+        previous_state = self.previous_states.get(receipt_number, {})
+        
+        headers = {}
+        if 'hash' in previous_state:
+            if previous_state.get('etag'):
+                headers['If-None-Match'] = previous_state['etag']
+            if previous_state.get('last_modified'):
+                headers['If-Modified-Since'] = previous_state['last_modified']
+        
+        for attempt in range(FETCH_ATTEMPTS):
+            try:
+                response = await client.get(url, headers=headers, timeout=30)
+                
+                validators = {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified')
+                }
+                if response.status_code == 304:
+                    return NOT_MODIFIED, validators
+                response.raise_for_status()
+                
+                # An identical body means nothing changed; skip parsing and hashing it
+                raw = response.content
+                validators['bytes_hash'] = hashlib.blake2b(raw, digest_size=16).hexdigest()
+                if 'hash' in previous_state and previous_state.get('bytes_hash') == validators['bytes_hash']:
+                    return NOT_MODIFIED, validators
+                
+                try:
+                    return json.loads(raw), validators
+                except ValueError as e:
+                    # A non-JSON body (e.g. the login page served once cookies expire) won't fix itself
+                    self.logger.error("Invalid JSON response for %s: %s", receipt_number, e)
+                    return None, {}
+                
+            except httpx.HTTPError as e:
+                # Only transport errors and 5xx are transient; client errors such as
+                # expired cookies won't fix themselves, so don't retry them
+                retryable = isinstance(e, httpx.TransportError) or (
+                    isinstance(e, httpx.HTTPStatusError) and e.response.status_code >= 500
+                )
+                if attempt == FETCH_ATTEMPTS - 1 or not retryable:
+                    self.logger.error("Error fetching data for %s: %s", receipt_number, e)
+                    return None, {}
+                
+                delay = 2 ** attempt + random.random()
+                self.logger.warning("Error fetching data for %s: %s; retrying in %.1fs", receipt_number, e, delay)
+                await asyncio.sleep(delay)
     
     def calculate_hash(self, data: dict) -> str:
-        """Calculate hash of relevant case data"""
-        # Remove timestamp fields that change frequently but aren't meaningful
-        filtered_data = self.filter_relevant_data(data)
-        return hashlib.md5(json.dumps(filtered_data, sort_keys=True).encode()).hexdigest()
+        """Calculate hash of relevant case data
+        
+        The case is streamed into a single blake2b hasher. Fields in
+        IGNORED_FIELDS are skipped at the case and event level rather than
+        copied out, and events go through hashers specialised to their schema.
+        """
+        # Timestamp fields change frequently but aren't meaningful
+        if 'data' in data:
+            fields = data['data']
+            ignored = IGNORED_FIELDS
+        else:
+            fields = data
+            ignored = ()
+        
+        h = hashlib.blake2b(digest_size=16)
+        h.update(b'{')
+        for key in sorted(fields):
+            if key in ignored:
+                continue
+            h.update(repr(key).encode('utf-8'))
+            h.update(b':')
+            if key == 'events' and isinstance(fields[key], list):
+                self.update_events_hash(h, fields[key], ignored)
+            else:
+                self.update_hash(h, fields[key])
+            h.update(b',')
+        h.update(b'}')
+        
+        return h.hexdigest()
     
-    def filter_relevant_data(self, data: dict) -> dict:
-        """Filter out fields that change frequently but aren't status changes"""
-        if 'data' not in data:
-            return data
-            
-        case_data = data['data'].copy()
+    def update_events_hash(self, h, events: list, ignored=()):
+        """Feed events into the hasher, using a hasher specialised to each event's schema"""
+        h.update(b'[')
+        for event in events:
+            if isinstance(event, dict) and all(isinstance(k, str) for k in event):
+                self.get_event_hasher(tuple(event), ignored)(h, event, self.update_hash)
+            else:
+                self.update_hash(h, event, ignored)
+            h.update(b',')
+        h.update(b']')
+    
+    def get_event_hasher(self, keys: tuple, ignored=()):
+        """Return the hasher specialised to an event schema, generating it on first use"""
+        cache_key = (keys, ignored)
+        hasher = self._hashers.get(cache_key)
+        if hasher is None:
+            hasher = self._hashers[cache_key] = self.build_hasher(keys, ignored)
+        return hasher
+    
+    def build_hasher(self, keys: tuple, ignored=()):
+        """Generate a function hashing a dict with exactly these keys
         
-        # Remove fields that update frequently but don't indicate status changes
-        fields_to_remove = ['updatedAtTimestamp', 'createdAtTimestamp']
+        It feeds the same bytes as update_hash, with the key sort, ignored-key
+        checks and per-key encoding done once here instead of on every event.
+        Keys are embedded via repr, so they are always inert literals.
+        """
+        lines = ["def hasher(h, value, update_hash):", "    h.update(b'{')"]
+        for key in sorted(k for k in keys if k not in ignored):
+            prefix = repr(key).encode('utf-8') + b':'
+            lines += [
+                f"    v = value[{key!r}]",
+                f"    h.update({prefix!r})",
+                "    if isinstance(v, (dict, list, tuple)):",
+                "        update_hash(h, v)",
+                "    else:",
+                "        h.update(repr(v).encode('utf-8'))",
+                "    h.update(b',')",
+            ]
+        lines.append("    h.update(b'}')")
         
-        for field in fields_to_remove:
-            case_data.pop(field, None)
-            
-        # For events, only keep the meaningful data
-        if 'events' in case_data:
-            filtered_events = []
-            for event in case_data['events']:
-                filtered_event = {k: v for k, v in event.items() 
-                                if k not in ['createdAtTimestamp', 'updatedAtTimestamp']}
-                filtered_events.append(filtered_event)
-            case_data['events'] = filtered_events
-            
-        return {'data': case_data}
+        namespace = {}
+        exec('\n'.join(lines), namespace)
+        return namespace['hasher']
+    
+    def digest_value(self, value) -> str:
+        """Return the blake2b hex digest of a single value"""
+        h = hashlib.blake2b(digest_size=16)
+        self.update_hash(h, value)
+        return h.hexdigest()
+    
+    def update_hash(self, h, value, ignored=()):
+        """Feed a canonical, type-tagged byte encoding of value into the hasher
+        
+        Keys listed in ignored are skipped at the top level of a dict value.
+        """
+        if isinstance(value, dict):
+            h.update(b'{')
+            for key in sorted(value):
+                if key in ignored:
+                    continue
+                h.update(repr(key).encode('utf-8'))
+                h.update(b':')
+                self.update_hash(h, value[key])
+                h.update(b',')
+            h.update(b'}')
+        elif isinstance(value, (list, tuple)):
+            h.update(b'[')
+            for item in value:
+                self.update_hash(h, item)
+                h.update(b',')
+            h.update(b']')
+        else:
+            # repr quotes strings, so 1 and '1' hash differently
+            h.update(repr(value).encode('utf-8'))
     
     def detect_changes(self, receipt_number: str, current_data: dict) -> List[str]:
-        """Detect what changed between current and previous data"""
+        """Detect what changed between the previous state and current data"""
         changes = []
         
-        if receipt_number not in self.previous_states:
+        previous_state = self.previous_states.get(receipt_number)
+        if previous_state is None:
             changes.append("Initial monitoring setup")
             return changes
         
-        prev_data = self.previous_states[receipt_number]['data']
         curr_data = current_data['data']
         
         # Check for status changes in main application
-        if prev_data.get('updatedAt') != curr_data.get('updatedAt'):
-            changes.append(f"Case updated: {curr_data.get('updatedAt')}")
+        curr_updated_at = curr_data.get('updatedAt')
+        if previous_state.get('updated_at') != curr_updated_at:
+            changes.append(f"Case updated: {curr_updated_at}")
         
         # Check for new events
-        prev_events = prev_data.get('events', [])
         curr_events = curr_data.get('events', [])
         
-        if len(curr_events) > len(prev_events):
-            new_events = len(curr_events) - len(prev_events)
-            changes.append(f"{new_events} new event(s) added")
+        new_events = self.find_new_items(previous_state.get('event_keys', []), curr_events, self.event_key)
+        if new_events:
+            changes.append(f"{len(new_events)} new event(s) added")
             
-            # Detail the latest events
-            for event in curr_events[:new_events]:
+            # Detail the new events
+            for event in new_events:
+                if not isinstance(event, dict):
+                    event = {}
                 event_code = event.get('eventCode', 'Unknown')
                 event_date = event.get('eventDateTime', 'Unknown date')
                 changes.append(f"New event: {event_code} on {event_date}")
         
         # Check for evidence request changes
-        prev_evidence = len(prev_data.get('evidenceRequests', []))
-        curr_evidence = len(curr_data.get('evidenceRequests', []))
+        curr_evidence = curr_data.get('evidenceRequests', [])
         
-        if curr_evidence > prev_evidence:
+        if self.find_new_items(previous_state.get('evidence_keys', []), curr_evidence, self.item_key):
             changes.append("New evidence request received")
         
         # Check for notice changes
-        prev_notices = len(prev_data.get('notices', []))
-        curr_notices = len(curr_data.get('notices', []))
+        curr_notices = curr_data.get('notices', [])
         
-        if curr_notices > prev_notices:
+        if self.find_new_items(previous_state.get('notice_keys', []), curr_notices, self.item_key):
             changes.append("New notice received")
         
         return changes
     
+    def summarize_case(self, current_data: dict) -> dict:
+        """Reduce fetched case data to what detect_changes needs next cycle"""
+        case_data = current_data.get('data', {})
+        return {
+            'updated_at': case_data.get('updatedAt'),
+            'event_keys': list(dict.fromkeys(self.event_key(e) for e in case_data.get('events', []))),
+            'evidence_keys': list(dict.fromkeys(self.item_key(e) for e in case_data.get('evidenceRequests', []))),
+            'notice_keys': list(dict.fromkeys(self.item_key(n) for n in case_data.get('notices', [])))
+        }
+    
+    def find_new_items(self, prev_keys: list, curr_items: list, key) -> list:
+        """Return items in curr_items whose key is not in prev_keys"""
+        prev_keys = set(prev_keys)
+        return [item for item in curr_items if key(item) not in prev_keys]
+    
+    def event_key(self, event) -> str:
+        """Identify an event by its code and timestamp, falling back to a digest of its content"""
+        if not isinstance(event, dict):
+            return self.digest_value(event)
+        return f"{event.get('eventCode')}{event.get('eventDateTime')}"
+    
+    def item_key(self, item):
+        """Identify an evidence request or notice by its id, falling back to a digest of its content"""
+        if isinstance(item, dict) and 'id' in item:
+            item_id = item['id']
+            try:
+                hash(item_id)
+            except TypeError:
+                return self.digest_value(item)
+            return item_id
+        return self.digest_value(item)
+    
     def send_notification(self, title: str, message: str):
         """Send notification via Home Assistant"""
-        ha_config = self.config.get('home_assistant', {})
-        
-        if not ha_config:
+        if self.ha_session is None:
             self.logger.warning("Home Assistant not configured, skipping notification")
             return
         
-        url = f"{ha_config['url']}/api/services/notify/{ha_config['notify_service'].split('.')[1]}"
-        
-        headers = {
-            'Authorization': f"Bearer {ha_config['token']}",
-            'Content-Type': 'application/json'
-        }
-        
         payload = {
             'title': title,
             'message': message
         }
         
         try:
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
+            response = self.ha_session.post(self._ha_url, json=payload, timeout=10)
             response.raise_for_status()
             self.logger.info("Notification sent successfully")
             
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Failed to send notification: {e}")
+        except httpx.HTTPError as e:
+            self.logger.error("Failed to send notification: %s", e)
     
-    def check_cases(self):
+    def send_batched_notifications(self, notifications: List[Tuple[str, str]]):
+        """Send all case updates from one cycle as a single notification"""
+        if not notifications:
+            return
+        
+        if len(notifications) == 1:
+            self.send_notification(*notifications[0])
+            return
+        
+        title = f"USCIS Case Updates: {len(notifications)} cases"
+        message = "\n\n".join(f"{case_title}\n{case_message}" for case_title, case_message in notifications)
+        self.send_notification(title, message)
+    
+    async def check_cases(self):
         """Check all configured cases for changes"""
         current_states = {}
+        notifications = []
+        cases = self.config['cases']
+        receipts = [case['receipt_number'] for case in cases]
         
-        for case in self.config['cases']:
-            receipt_number = case['receipt_number']
-            description = case.get('description', receipt_number)
-            
-            self.logger.info(f"Checking case: {receipt_number}")
-            
-            current_data = self.get_case_data(receipt_number)
-            if not current_data:
-                self.logger.error(f"Failed to fetch data for {receipt_number}")
-                continue
-            
-            current_hash = self.calculate_hash(current_data)
-            previous_hash = self.previous_states.get(receipt_number, {}).get('hash')
-            
-            current_states[receipt_number] = {
-                'hash': current_hash,
-                'data': current_data,
-                'last_checked': datetime.now().isoformat(),
-                'description': description
-            }
+        for receipt_number in receipts:
+            self.logger.info("Checking case: %s", receipt_number)
+        
+        try:
+            # Fetch all cases concurrently over one multiplexed connection
+            async with self.create_client() as client:
+                results = await asyncio.gather(*[self.get_case_data(client, r) for r in receipts])
             
-            if current_hash != previous_hash:
-                changes = self.detect_changes(receipt_number, current_data)
+            for case, (current_data, validators) in zip(cases, results):
+                receipt_number = case['receipt_number']
+                description = case.get('description', receipt_number)
                 
-                if changes:
-                    self.logger.info(f"Changes detected for {receipt_number}: {changes}")
-                    
-                    title = f"USCIS Case Update: {description}"
-                    message = f"Case {receipt_number} has been updated:\n" + "\n".join(f"• {change}" for change in changes)
-                    
-                    self.send_notification(title, message)
+                if current_data is NOT_MODIFIED:
+                    # Server confirmed nothing changed; reuse the stored state without rehashing
+                    previous_state = self.previous_states[receipt_number]
+                    current_states[receipt_number] = {
+                        **previous_state,
+                        'etag': validators['etag'] or previous_state.get('etag'),
+                        'last_modified': validators['last_modified'] or previous_state.get('last_modified'),
+                        'bytes_hash': validators.get('bytes_hash') or previous_state.get('bytes_hash'),
+                        'last_checked': datetime.now().isoformat(),
+                        'description': description
+                    }
+                    self.logger.info("No changes for %s (not modified)", receipt_number)
+                    continue
+                
+                if not current_data:
+                    self.logger.error("Failed to fetch data for %s", receipt_number)
+                    continue
+                
+                try:
+                    current_hash = self.calculate_hash(current_data)
+                    previous_hash = self.previous_states.get(receipt_number, {}).get('hash')
+                    changes = self.detect_changes(receipt_number, current_data) if current_hash != previous_hash else []
+                    summary = self.summarize_case(current_data)
+                except Exception as e:
+                    # Leave the case out of current_states so it keeps its previous state
+                    self.logger.error("Failed to process data for %s: %s", receipt_number, e)
+                    continue
+                
+                current_states[receipt_number] = {
+                    'hash': current_hash,
+                    **summary,
+                    'etag': validators['etag'],
+                    'last_modified': validators['last_modified'],
+                    'bytes_hash': validators['bytes_hash'],
+                    'last_checked': datetime.now().isoformat(),
+                    'description': description
+                }
+                
+                if current_hash != previous_hash:
+                    if changes:
+                        self.logger.info("Changes detected for %s: %s", receipt_number, changes)
+                        
+                        title = f"USCIS Case Update: {description}"
+                        message = f"Case {receipt_number} has been updated:\n" + "\n".join(f"• {change}" for change in changes)
+                        
+                        notifications.append((title, message))
+                    else:
+                        self.logger.info("Hash changed but no significant changes detected for %s", receipt_number)
                 else:
-                    self.logger.info(f"Hash changed but no significant changes detected for {receipt_number}")
-            else:
-                self.logger.info(f"No changes for {receipt_number}")
-        
-        # Save current states
-        self.save_states(current_states)
-        self.previous_states = current_states
+                    self.logger.info("No changes for %s", receipt_number)
+        finally:
+            # Always notify and persist, even if a case failed part-way through,
+            # so detected changes aren't lost and failed cases keep their last state
+            self.send_batched_notifications(notifications)
+            
+            for receipt_number in receipts:
+                if receipt_number not in current_states and receipt_number in self.previous_states:
+                    current_states[receipt_number] = self.previous_states[receipt_number]
+            
+            self.save_states(current_states)
+            self.previous_states = current_states
     
     def run_once(self):
         """Run a single check cycle"""
         self.logger.info("Starting USCIS case check")
-        self.check_cases()
+        self.refresh_cookies()
+        asyncio.run(self.check_cases())
         self.logger.info("USCIS case check completed")
     
     def run_continuously(self):
-        """Run monitoring continuously"""
+        """Run monitoring continuously
+        
+        Intended for development; in production schedule run_once via a
+        systemd timer or cron so no process stays resident between checks.
+        """
         interval_hours = self.config.get('check_interval_hours', 6)
         interval_seconds = interval_hours * 3600
         
-        self.logger.info(f"Starting USCIS monitor with {interval_hours} hour intervals")
+        self.logger.info("Starting USCIS monitor with %s hour intervals", interval_hours)
+        
+        # Schedule against the monotonic clock so the period doesn't drift by
+        # the duration of each check or jump with wall-clock changes
+        next_t = time.monotonic() + interval_seconds
+        fail_count = 0
         
         while True:
             try:
                 self.run_once()
-                self.logger.info(f"Next check in {interval_hours} hours")
-                time.sleep(interval_seconds)
+                fail_count = 0
+                self.logger.info("Next check in %s hours", interval_hours)
+                time.sleep(max(0, next_t - time.monotonic()))
+                next_t += interval_seconds
                 
             except KeyboardInterrupt:
                 self.logger.info("Monitor stopped by user")
                 break
             except Exception as e:
-                self.logger.error(f"Unexpected error: {e}")
-                self.logger.info(f"Retrying in {interval_hours} hours")
-                time.sleep(interval_seconds)
+                # Back off exponentially from 5 minutes, capped at the normal interval
+                delay = min(300 * 2 ** fail_count, interval_seconds)
+                fail_count += 1
+                self.logger.error("Unexpected error: %s", e)
+                self.logger.info("Retrying in %.0f minutes", delay / 60)
+                time.sleep(delay)
+                next_t = time.monotonic() + interval_seconds
 
 def main():
     import argparse